@@ -3,12 +3,15 @@ from typing import Optional
 from datetime import datetime, timedelta
 
 
-@dataclass(order=True)
+@dataclass(order=True, slots=True)
 class CarbonIntensityPointEstimate:
     """Represents a single data point within an intensity
     timeseries. Use order=True in order to enable comparison of class
     instance based on the first attribute. See
     https://peps.python.org/pep-0557
+
+    Instances are created in bulk, so use slots=True to drop the
+    per-instance __dict__.
     """
 
     value: float  # the first attribute is used automatically for sorting methods
@@ -18,7 +21,7 @@ class CarbonIntensityPointEstimate:
         return f"{self.datetime.isoformat()}\t{self.value}"
 
 
-@dataclass(order=True)
+@dataclass(order=True, slots=True)
 class CarbonIntensityAverageEstimate:
     """Represents a single data point within an *integrated* carbon
     intensity timeseries. Use order=True in order to enable comparison
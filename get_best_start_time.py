@@ -3,12 +3,75 @@ Simple function to get the best start time for a job using CATS internal logic.
 This module uses mocked API responses to avoid requiring an API key.
 """
 
+from collections.abc import Sequence
+from dataclasses import dataclass
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Tuple
+from functools import lru_cache
+import importlib.util
+from typing import Optional, Tuple
+import numpy as np
 from cats.forecast import CarbonIntensityPointEstimate, WindowedForecast
 
+# Numba is optional and only imported by the first scan large enough to use it
+have_numba = importlib.util.find_spec("numba") is not None
 
-def _generate_mock_forecast() -> list[CarbonIntensityPointEstimate]:
+# Forecast values are stored as integers in tenths of a gCO2eq/kWh
+INTENSITY_SCALE = 10
+
+# Mock base intensity and variation for each hour of the day (UTC), in the
+# same units as Forecast.values. Late evening (22-2 h): decreasing
+_HOUR_BASE_INTENSITY = np.full(24, 1400, dtype=np.int16)
+_HOUR_VARIATION = np.full(24, 300, dtype=np.int16)
+# Night: low carbon intensity (renewable energy dominates)
+_HOUR_BASE_INTENSITY[2:6], _HOUR_VARIATION[2:6] = 900, 200
+# Morning: ramping up
+_HOUR_BASE_INTENSITY[6:9], _HOUR_VARIATION[6:9] = 1500, 300
+# Day: moderate intensity
+_HOUR_BASE_INTENSITY[9:17], _HOUR_VARIATION[9:17] = 1800, 400
+# Evening peak: high intensity
+_HOUR_BASE_INTENSITY[17:22], _HOUR_VARIATION[17:22] = 2500, 300
+
+# Pseudo-random variation pattern, repeating every 7 data points, in tenths
+# of the hourly variation
+_NOISE = np.arange(-3, 4, dtype=np.int8)
+
+
+@dataclass(frozen=True, eq=False)
+class Forecast(Sequence):
+    """
+    Carbon intensity forecast stored as parallel arrays.
+    
+    A read-only sequence of CarbonIntensityPointEstimate objects, each built
+    only when it is indexed, so a Forecast can be used wherever a list of
+    point estimates is expected (e.g. by cats.forecast.WindowedForecast).
+    Slicing returns a plain list of the selected point estimates. Code that
+    only needs the numbers should read `values` and `timestamps` directly.
+    """
+    
+    values: np.ndarray  # carbon intensity (tenths of gCO2eq/kWh), int32
+    timestamps: np.ndarray  # UTC, datetime64[s]
+    
+    def __len__(self) -> int:
+        return len(self.values)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._point(i) for i in range(*index.indices(len(self)))]
+        return self._point(index)
+    
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._point(index)
+    
+    def _point(self, index: int) -> CarbonIntensityPointEstimate:
+        return CarbonIntensityPointEstimate(
+            value=self.values[index].item() / INTENSITY_SCALE,
+            datetime=self.timestamps[index].item().replace(tzinfo=timezone.utc)
+        )
+
+
+def _generate_mock_forecast(now: Optional[datetime] = None) -> Forecast:
     """
     Generate a mock carbon intensity forecast for the next 48 hours.
     
@@ -18,62 +81,295 @@ def _generate_mock_forecast() -> list[CarbonIntensityPointEstimate]:
     - High intensity during evening peak (6-10 PM): 220-280 gCO2/kWh
     - Returns to low overnight
     
+    Args:
+        now: Current time (timezone-aware); defaults to the system clock
+    
     Returns:
-        List of CarbonIntensityPointEstimate objects covering 48 hours in 30-minute intervals
+        Forecast covering 48 hours in 30-minute intervals
     """
-    start_time = datetime.now(timezone.utc)
-    # Round to nearest half hour
-    if start_time.minute < 30:
-        start_time = start_time.replace(minute=0, second=0, microsecond=0)
-    else:
-        start_time = start_time.replace(minute=30, second=0, microsecond=0)
+    now_seconds = now.timestamp() if now else time.time()
     
-    forecast = []
+    # Round down to the half hour. The pattern only depends on that slot, so
+    # calls within the same slot share one cached (read-only) forecast
+    return _mock_forecast_for_slot(int(now_seconds // 1800))
+
+
+@lru_cache(maxsize=4)
+def _mock_forecast_for_slot(slot: int) -> Forecast:
+    """
+    Build the mock forecast starting at the given half-hour slot.
     
+    Args:
+        slot: Number of 30-minute intervals since the Unix epoch
+    
+    Returns:
+        Forecast covering 48 hours in 30-minute intervals
+    """
     # Generate 96 data points (48 hours in 30-minute intervals)
-    for i in range(96):
-        timestamp = start_time + timedelta(minutes=30 * i)
-        hour = timestamp.hour
+    i = np.arange(96)
+    timestamps = np.datetime64(slot * 1800, 's') + i * np.timedelta64(1800, 's')
+    # The epoch starts at midnight UTC, so the slot also counts half hours of
+    # the day: no need to decode the timestamps to get each point's hour
+    hour = (slot % 48 + i) // 2 % 24
+    
+    # Simulate realistic carbon intensity patterns
+    base_intensity = _HOUR_BASE_INTENSITY[hour]
+    variation = _HOUR_VARIATION[hour]
+    
+    # Add some pseudo-random variation based on the hour
+    intensity = (base_intensity + _NOISE[i % 7] * (variation // 10)).astype(np.int32)
+    
+    intensity.flags.writeable = False
+    timestamps.flags.writeable = False
+    return Forecast(values=intensity, timestamps=timestamps)
+
+
+def _best_windows(
+    forecast: Forecast,
+    start: datetime,
+    jobs: list[Tuple[int, int]]
+) -> list[Tuple[datetime, float]]:
+    """
+    Find the window with the lowest average carbon intensity for each job.
+    
+    Gives the same answers as min(WindowedForecast(...)), which it falls back
+    to unless the forecast is sampled every 30 minutes. In that case windows
+    start at `start` and every 30 minutes after it, and each one is integrated
+    with the trapezoidal rule after interpolating its edges between the
+    surrounding data points. Instead of integrating every window separately,
+    the trapezoid areas are accumulated once so that each window total is the
+    difference of two prefix sums, corrected for the partial intervals at
+    either edge: O(n) per job whatever the window size. Jobs of the same
+    shape are only scanned once.
+    
+    Args:
+        forecast: Forecast in chronological order
+        start: Earliest start time, within the forecast
+        jobs: (duration_minutes, max_window_minutes) pairs, one per job
+    
+    Returns:
+        List of (optimal start time, average carbon intensity) tuples, in the
+        same order as jobs
+    
+    Raises:
+        ValueError: If the forecast does not cover a single window for a job
+    """
+    epoch_seconds = forecast.timestamps.astype(np.int64)
+    results = {}
+    
+    # The prefix sums rely on evenly spaced data points; anything else goes
+    # through the general CATS implementation
+    if not np.all(np.diff(epoch_seconds) == 1800):
+        for duration_minutes, max_window_minutes in dict.fromkeys(jobs):
+            windows = list(WindowedForecast(
+                data=forecast,
+                duration=duration_minutes,
+                start=start,
+                max_window_minutes=max_window_minutes
+            ))
+            # Compare the averages as one array rather than pairwise through
+            # CarbonIntensityAverageEstimate's rich comparisons
+            averages = np.fromiter(
+                (window.value for window in windows), dtype=np.float64, count=len(windows)
+            )
+            best_window = windows[int(averages.argmin())]
+            results[duration_minutes, max_window_minutes] = (best_window.start, best_window.value)
+        return [results[job] for job in jobs]
+    
+    start_seconds = start.timestamp()
+    first = int(np.searchsorted(epoch_seconds, start_seconds, side='right')) - 1
+    values = forecast.values[first:]
+    
+    offset_seconds = start_seconds - int(epoch_seconds[first])
+    
+    for job in dict.fromkeys(jobs):
+        scan = _window_scanner(*job)
+        idx, average = scan(values, offset_seconds)
+        results[job] = (start + timedelta(minutes=30 * idx), average)
+    return [results[job] for job in jobs]
+
+
+@lru_cache(maxsize=16)
+def _window_scanner(duration_minutes: int, max_window_minutes: int):
+    """
+    Build the window search for one job shape.
+    
+    Everything that only depends on the duration and search window is worked
+    out once per shape. The returned function takes the forecast values from
+    the data point preceding the start time onwards, and the start time's
+    offset past that point in seconds, and returns the index and average
+    carbon intensity (gCO2eq/kWh) of the best window.
+    """
+    duration_steps = duration_minutes / 30
+    max_windows = max_window_minutes // 30 + 1
+    horizon_seconds = 60 * (max_window_minutes + duration_minutes)
+    to_average = 30 / duration_minutes / INTENSITY_SCALE
+    
+    def scan(values: np.ndarray, offset_seconds: float) -> Tuple[int, float]:
+        # Window edges relative to the data point preceding each window start,
+        # in 30-minute steps: the start is `offset` steps past that point and
+        # the end falls `end_frac` steps past the `end_step`-th point after it
+        offset = offset_seconds / 1800
+        end_step, end_frac = divmod(offset + duration_steps, 1)
+        end_step = int(end_step)
         
-        # Simulate realistic carbon intensity patterns
-        if 2 <= hour < 6:
-            # Night: low carbon intensity (renewable energy dominates)
-            base_intensity = 90
-            variation = 20
-        elif 6 <= hour < 9:
-            # Morning: ramping up
-            base_intensity = 150
-            variation = 30
-        elif 9 <= hour < 17:
-            # Day: moderate intensity
-            base_intensity = 180
-            variation = 40
-        elif 17 <= hour < 22:
-            # Evening peak: high intensity
-            base_intensity = 250
-            variation = 30
-        else:
-            # Late evening: decreasing
-            base_intensity = 140
-            variation = 30
+        # Mirror WindowedForecast: windows need a data point past their end
+        # when it doesn't fall exactly on one, and only data up to the end of
+        # the last job starting within the search window is considered
+        ndata = end_step + 1 if end_frac else end_step
+        available = min(len(values), int((offset_seconds + horizon_seconds) // 1800) + 1)
+        n_windows = min(available - ndata, max_windows)
+        if n_windows < 1:
+            raise ValueError(
+                "Insufficient forecast data for the specified time window constraints."
+            )
         
-        # Add some pseudo-random variation based on the hour
-        intensity = base_intensity + (i % 7 - 3) * (variation / 10)
+        idx, total = _scan_windows(values, offset, end_step, end_frac, n_windows)
+        return idx, total * to_average
+    
+    return scan
+
+
+def _scan_windows_numpy(
+    values: np.ndarray,
+    offset: float,
+    end_step: int,
+    end_frac: float,
+    n_windows: int
+) -> Tuple[int, float]:
+    """
+    Return the index and integral (in 30-minute steps) of the window with the
+    lowest carbon intensity, using NumPy prefix sums.
+    
+    Window k starts `offset` steps past data point k and ends `end_frac` steps
+    past data point k + end_step.
+    """
+    # csum[j] is twice the integral from the first data point to the j-th
+    # one, which keeps the running sum exact for integer values
+    csum = np.concatenate(([0], np.cumsum(values[:-1] + values[1:], dtype=np.int64)))
+    sums = 0.5 * (csum[end_step:end_step + n_windows] - csum[:n_windows])
+    
+    # Integral from each data point to `frac` steps past it, assuming data
+    # points are joined by straight lines
+    slope = np.diff(values, append=values[-1])
+    if end_frac:
+        sums += (end_frac * values + 0.5 * end_frac ** 2 * slope)[end_step:end_step + n_windows]
+    if offset:
+        sums -= (offset * values + 0.5 * offset ** 2 * slope)[:n_windows]
+    
+    idx = int(np.argmin(sums))
+    return idx, float(sums[idx])
+
+
+# Scans with more windows than this go to the Numba kernels when Numba is
+# installed, one block of this many windows per thread. Smaller scans, which
+# includes every scan the public API can ask for, stay on NumPy: they are no
+# faster under Numba and would pay for its import and JIT compile
+_BLOCK_SIZE = 4096
+
+
+@lru_cache(maxsize=1)
+def _numba_scan():
+    """
+    Import Numba and build the parallel window scan. Only called once a scan
+    is big enough to need it, so importing this module never loads Numba.
+    """
+    from numba import njit, prange
+    
+    @njit(cache=True, fastmath=True, nogil=True)
+    def scan_block(values, offset, end_step, end_frac, first, last):
+        """
+        Numba version of _scan_windows_numpy over windows first..last-1: slides
+        a running trapezoid sum across the data instead of materialising
+        every window total.
+        """
+        # Twice the integral over the whole intervals of the window, so that
+        # integer values are summed exactly
+        total = 0
+        for j in range(first, first + end_step):
+            total += values[j] + values[j + 1]
         
-        forecast.append(
-            CarbonIntensityPointEstimate(
-                value=intensity,
-                datetime=timestamp
-            )
-        )
+        best = 0.0
+        best_idx = first
+        for k in range(first, last):
+            if k > first:
+                # Take in the interval entering the window, drop the one leaving
+                total += values[k + end_step - 1] + values[k + end_step]
+                total -= values[k - 1] + values[k]
+            window = 0.5 * total
+            if end_frac:
+                slope = values[k + end_step + 1] - values[k + end_step]
+                window += end_frac * values[k + end_step] + 0.5 * end_frac ** 2 * slope
+            if offset:
+                slope = values[k + 1] - values[k]
+                window -= offset * values[k] + 0.5 * offset ** 2 * slope
+            if k == first or window < best:
+                best = window
+                best_idx = k
+        return best_idx, best
+    
+    @njit(cache=True, fastmath=True, nogil=True, parallel=True)
+    def scan_blocks(values, offset, end_step, end_frac, n_windows):
+        """
+        Scan blocks of _BLOCK_SIZE windows on separate threads, then keep the
+        best of the per-block results (the earliest one on ties).
+        """
+        n_blocks = (n_windows + _BLOCK_SIZE - 1) // _BLOCK_SIZE
+        block_idx = np.empty(n_blocks, dtype=np.int64)
+        block_best = np.empty(n_blocks, dtype=np.float64)
+        for block in prange(n_blocks):
+            first = block * _BLOCK_SIZE
+            last = min(first + _BLOCK_SIZE, n_windows)
+            idx, best = scan_block(values, offset, end_step, end_frac, first, last)
+            block_idx[block] = idx
+            block_best[block] = best
+        block = np.argmin(block_best)
+        return block_idx[block], block_best[block]
+    
+    return scan_blocks
+
+
+def _scan_windows(
+    values: np.ndarray,
+    offset: float,
+    end_step: int,
+    end_frac: float,
+    n_windows: int
+) -> Tuple[int, float]:
+    """
+    Same as _scan_windows_numpy, but scans of more than _BLOCK_SIZE windows
+    are spread across threads with Numba when it is installed.
+    """
+    if have_numba and n_windows > _BLOCK_SIZE:
+        idx, best = _numba_scan()(values, offset, end_step, end_frac, n_windows)
+        return int(idx), float(best)
+    return _scan_windows_numpy(values, offset, end_step, end_frac, n_windows)
+
+
+def _validation_error(duration_minutes: int, max_window_minutes: int) -> ValueError:
+    """
+    Build the error explaining why get_best_start_time() rejected its inputs.
+    
+    Kept out of get_best_start_time() so valid calls only pay for a single
+    chained comparison.
+    """
+    if duration_minutes < 1:
+        return ValueError("Duration must be at least 1 minute")
+    
+    if max_window_minutes < 1 or max_window_minutes > 2820:
+        return ValueError("Window must be between 1 and 2820 minutes (47 hours)")
     
-    return forecast
+    return ValueError(
+        f"Job duration ({duration_minutes} minutes) exceeds specified window "
+        f"({max_window_minutes} minutes)"
+    )
 
 
 def get_best_start_time(
     duration_minutes: int,
     region: str = "GB",
-    max_window_hours: int = 24
+    max_window_hours: int = 24,
+    now: Optional[datetime] = None
 ) -> Tuple[datetime, float]:
     """
     Find the optimal start time for a job to minimize carbon emissions.
@@ -86,6 +382,7 @@ def get_best_start_time(
         duration_minutes: Expected duration of the job in minutes
         region: Geographic region (currently only "GB" supported, parameter kept for API compatibility)
         max_window_hours: Maximum hours to look ahead for optimal time (default: 24, max: 47)
+        now: Time to schedule from (default: the current time)
     
     Returns:
         Tuple containing:
@@ -100,51 +397,62 @@ def get_best_start_time(
         >>> print(f"Best start time: {start_time}")
         >>> print(f"Carbon intensity: {carbon_intensity:.2f} gCO2eq/kWh")
     """
+    return get_best_start_times([(duration_minutes, max_window_hours)], region, now)[0]
+
+
+def get_best_start_times(
+    jobs: list[Tuple[int, int]],
+    region: str = "GB",
+    now: Optional[datetime] = None
+) -> list[Tuple[datetime, float]]:
+    """
+    Find the optimal start times for several jobs at once.
     
-    # Validate inputs
-    if duration_minutes < 1:
-        raise ValueError("Duration must be at least 1 minute")
+    Equivalent to calling get_best_start_time() for each job, except that the
+    forecast is only generated once and all jobs are scheduled against the
+    same current time.
     
-    max_window_minutes = max_window_hours * 60
-    if max_window_minutes < 1 or max_window_minutes > 2820:
-        raise ValueError("Window must be between 1 and 2820 minutes (47 hours)")
+    Args:
+        jobs: (duration_minutes, max_window_hours) pairs, one per job
+        region: Geographic region (currently only "GB" supported, parameter kept for API compatibility)
+        now: Time to schedule from (default: the current time)
     
-    if duration_minutes > max_window_minutes:
-        raise ValueError(
-            f"Job duration ({duration_minutes} minutes) exceeds specified window "
-            f"({max_window_minutes} minutes)"
-        )
+    Returns:
+        List of (optimal start time, average carbon intensity) tuples, in the
+        same order as jobs
+    
+    Raises:
+        ValueError: If any job's duration is invalid or its window constraints are not met
+    
+    Example:
+        >>> for start_time, carbon_intensity in get_best_start_times([(30, 24), (120, 12)]):
+        ...     print(f"{start_time:%H:%M} at {carbon_intensity:.2f} gCO2eq/kWh")
+    """
+    
+    # Validate inputs
+    jobs_minutes = []
+    for duration_minutes, max_window_hours in jobs:
+        max_window_minutes = max_window_hours * 60
+        if not 1 <= duration_minutes <= max_window_minutes <= 2820:
+            raise _validation_error(duration_minutes, max_window_minutes)
+        jobs_minutes.append((duration_minutes, max_window_minutes))
     
     # Note: region parameter is kept for API compatibility but currently ignored
     # as we're mocking UK data
     if region != "GB":
         print(f"Warning: Only GB region is currently supported. Using GB data.")
     
-    # Generate mock forecast data
-    forecast = _generate_mock_forecast()
-    
-    # Get current time
-    current_time = datetime.now(timezone.utc)
-    
-    # Create windowed forecast to find optimal start time
-    # This uses the CATS WindowedForecast class which:
-    # 1. Divides the forecast into overlapping windows of the job duration
-    # 2. Calculates the average carbon intensity for each window
-    # 3. Allows us to find the window with minimum carbon intensity
-    windowed_forecast = WindowedForecast(
-        data=forecast,
-        duration=duration_minutes,
-        start=current_time,
-        max_window_minutes=max_window_minutes
-    )
+    # Get current time once, so the forecast and the windows share the
+    # same reference even across a half-hour boundary
+    current_time = now.astimezone(timezone.utc) if now else datetime.now(timezone.utc)
     
-    # Find the window with the minimum average carbon intensity
-    # The WindowedForecast class makes each window comparable based on
-    # the average carbon intensity value
-    best_window = min(windowed_forecast)
+    # Generate mock forecast data
+    forecast = _generate_mock_forecast(current_time)
     
-    # Return the start time and average carbon intensity
-    return best_window.start, best_window.value
+    # Find the window with the minimum average carbon intensity. This follows
+    # the CATS WindowedForecast logic (overlapping windows of the job duration,
+    # each averaged over time) but scans all windows in a single pass
+    return _best_windows(forecast, current_time, jobs_minutes)
 
 
 def print_schedule_info(duration_minutes: int, region: str = "GB", max_window_hours: int = 24):
@@ -178,7 +486,7 @@ def print_schedule_info(duration_minutes: int, region: str = "GB", max_window_ho
         print(f"Search window:       {max_window_hours} hours")
         print(f"Region:              {region}")
         print("-"*60)
-        print(f"Optimal start time:  {local_start.strftime('%Y-%m-%d %H:%M:%S %Z')}")
+        print(f"Optimal start time:  {local_start.isoformat(sep=' ', timespec='seconds')}")
         print(f"Carbon intensity:    {carbon_intensity:.2f} gCO2eq/kWh")
         
         if delay.total_seconds() > 60:
@@ -206,3 +514,9 @@ if __name__ == "__main__":
     start_time, carbon_intensity = get_best_start_time(duration_minutes=30, region="GB")
     print(f"Best time to start a 30-minute job: {start_time.strftime('%H:%M')}")
     print(f"Expected carbon intensity: {carbon_intensity:.2f} gCO2eq/kWh")
+    
+    print("\nExample 4: Scheduling several jobs against the same forecast")
+    jobs = [(30, 24), (60, 24), (120, 12)]
+    for (duration, window), (start_time, carbon_intensity) in zip(jobs, get_best_start_times(jobs)):
+        print(f"{duration:>3}-minute job within {window}h: {start_time.strftime('%H:%M')} "
+              f"({carbon_intensity:.2f} gCO2eq/kWh)")
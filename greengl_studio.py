@@ -6,10 +6,9 @@ A Streamlit app for scheduling computational jobs to minimize carbon emissions.
 import streamlit as st
 import plotly.graph_objects as go
 from datetime import datetime, timezone, timedelta
-import pandas as pd
-import time
-import random
-from get_best_start_time import get_best_start_time, _generate_mock_forecast
+from typing import NamedTuple
+import numpy as np
+from get_best_start_time import get_best_start_time, _generate_mock_forecast, INTENSITY_SCALE
 from cats.forecast import WindowedForecast
 
 # Page configuration
@@ -20,8 +19,8 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS for better styling
-st.markdown("""
+# Custom CSS for better styling (including the simulation console)
+_CSS = """
 <style>
     .main-header {
         font-size: 3rem;
@@ -67,20 +66,62 @@ st.markdown("""
     .stButton>button:hover {
         background-color: #1B5E20;
     }
+    .console-box {
+        background-color: #0a0a0a;
+        color: #00ff00;
+        padding: 20px;
+        border-radius: 10px;
+        font-family: 'Courier New', monospace;
+        font-size: 14px;
+        max-height: 400px;
+        overflow-y: auto;
+        border: 2px solid #00ff00;
+        box-shadow: 0 0 10px rgba(0, 255, 0, 0.3);
+    }
+    .console-log {
+        margin: 5px 0;
+        line-height: 1.6;
+    }
+    .console-replay .console-log {
+        opacity: 0;
+        animation: reveal 0.1s forwards;
+    }
+    @keyframes reveal {
+        from { opacity: 0; }
+        to { opacity: 1; }
+    }
+    .console-header {
+        color: #00ffff;
+        font-weight: bold;
+        border-bottom: 1px solid #00ff00;
+        padding-bottom: 10px;
+        margin-bottom: 10px;
+    }
 </style>
-""", unsafe_allow_html=True)
+"""
 
-def create_comparison_graph(duration_minutes, ci_now, ci_optimal, optimal_time):
+
+# Plotly config shared by the app's charts: no mode bar
+_CHART_CONFIG = {'displayModeBar': False}
+
+# Marker colours for the green, moderate and red zones of the forecast chart
+_ZONE_COLORS = np.array(['#4CAF50', '#FFC107', '#f44336'])
+
+
+class CO2Result(NamedTuple):
+    """Emissions of a job run now vs at the optimal time (grams of CO2)"""
+    co2_now: float
+    co2_optimal: float
+    savings: float
+    savings_percent: float
+
+
+def _compute_co2(ci_now, ci_optimal, duration_minutes):
     """
-    Create a comparison bar chart showing carbon intensity for 'Now' vs 'Optimal'
-    
-    Args:
-        duration_minutes: Job duration in minutes
-        ci_now: Carbon intensity if started now
-        ci_optimal: Carbon intensity at optimal time
-        optimal_time: Datetime of optimal start time
+    CO2 emitted by the job if started now and at the optimal time, and the
+    savings between them. The single source for these numbers in the UI.
     """
-    # Calculate CO2 emissions (assuming 300W computer)
+    # Assuming a 300W computer
     power_kw = 0.3
     duration_hours = duration_minutes / 60
     
@@ -88,18 +129,29 @@ def create_comparison_graph(duration_minutes, ci_now, ci_optimal, optimal_time):
     co2_optimal = ci_optimal * power_kw * duration_hours
     savings = co2_now - co2_optimal
     savings_percent = (savings / co2_now * 100) if co2_now > 0 else 0
+    return CO2Result(co2_now, co2_optimal, savings, savings_percent)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def create_comparison_graph(duration_minutes, ci_now, ci_optimal, optimal_time):
+    """
+    Create a comparison bar chart showing carbon intensity for 'Now' vs 'Optimal'
+    
+    Cached per set of inputs, so reruns reuse the figure instead of rebuilding it.
     
+    Args:
+        duration_minutes: Job duration in minutes
+        ci_now: Carbon intensity if started now
+        ci_optimal: Carbon intensity at optimal time
+        optimal_time: Datetime of optimal start time
+    """
     # Create comparison data
     categories = ['If you run NOW<br>(Dirty)', f'If you run at {optimal_time.strftime("%I:%M %p")}<br>(Clean)']
     ci_values = [ci_now, ci_optimal]
-    co2_values = [co2_now, co2_optimal]
     colors = ['#f44336', '#4CAF50']  # Red for now, Green for optimal
     
-    # Create figure with secondary y-axis
-    fig = go.Figure()
-    
-    # Add carbon intensity bars
-    fig.add_trace(go.Bar(
+    # Carbon intensity bars
+    bar = go.Bar(
         name='Carbon Intensity',
         x=categories,
         y=ci_values,
@@ -111,10 +163,10 @@ def create_comparison_graph(duration_minutes, ci_now, ci_optimal, optimal_time):
                       'Carbon Intensity: %{y:.2f} gCO2/kWh<br>' +
                       '<extra></extra>',
         yaxis='y1'
-    ))
+    )
     
-    # Update layout
-    fig.update_layout(
+    # Build the figure in one go, so Plotly validates it once
+    layout = go.Layout(
         title={
             'text': f'Carbon Impact Comparison - {duration_minutes} Minute Job',
             'x': 0.5,
@@ -128,7 +180,10 @@ def create_comparison_graph(duration_minutes, ci_now, ci_optimal, optimal_time):
         yaxis={
             'title': 'Carbon Intensity (gCO2eq/kWh)',
             'titlefont': {'size': 16},
-            'tickfont': {'size': 14}
+            'tickfont': {'size': 14},
+            'showgrid': True,
+            'gridwidth': 1,
+            'gridcolor': 'rgba(128,128,128,0.2)'
         },
         height=500,
         showlegend=False,
@@ -136,76 +191,41 @@ def create_comparison_graph(duration_minutes, ci_now, ci_optimal, optimal_time):
         paper_bgcolor='rgba(0,0,0,0)',
         margin=dict(t=80, b=60, l=60, r=60)
     )
+    fig = go.Figure(data=[bar], layout=layout)
     
-    # Add gridlines
-    fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128,128,128,0.2)')
-    
-    return fig, co2_now, co2_optimal, savings, savings_percent
+    return fig
 
 
-def create_forecast_chart_with_zones(duration_minutes, optimal_time):
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _build_forecast_skeleton(slot):
     """
-    Create a line chart showing the 24-hour carbon intensity forecast
-    with RED ZONE (dirty) and GREEN ZONE (clean) highlighting
+    The parts of the forecast chart shared by every job scheduled in the
+    half-hour slot starting at slot: the forecast line and the zone bands.
+    Keyed by slot so the line always matches the schedule. Callers must copy
+    the Figure before changing anything.
     """
-    forecast = _generate_mock_forecast()
-    
-    # Extract data for plotting
-    times = [point.datetime for point in forecast[:48]]  # 24 hours
-    intensities = [point.value for point in forecast[:48]]
+    # Extract data for plotting (24 hours), as NumPy arrays
+    forecast = _generate_mock_forecast(slot)
+    times = forecast.timestamps[:48]
+    intensities = forecast.values[:48] / INTENSITY_SCALE
     
     # Define thresholds for red/green zones
     DIRTY_THRESHOLD = 180  # Above this = RED ZONE
     CLEAN_THRESHOLD = 120  # Below this = GREEN ZONE
     
-    # Create figure
-    fig = go.Figure()
-    
-    # Add red zone background (high carbon intensity)
-    fig.add_hrect(
-        y0=DIRTY_THRESHOLD,
-        y1=max(intensities) + 20,
-        fillcolor='rgba(244, 67, 54, 0.1)',
-        layer='below',
-        line_width=0,
-        annotation_text='🔴 RED ZONE (Dirty Grid)',
-        annotation_position='top right'
-    )
+    y_max = float(intensities.max()) + 20
     
-    # Add green zone background (low carbon intensity)
-    fig.add_hrect(
-        y0=0,
-        y1=CLEAN_THRESHOLD,
-        fillcolor='rgba(76, 175, 80, 0.1)',
-        layer='below',
-        line_width=0,
-        annotation_text='🟢 GREEN ZONE (Clean Grid)',
-        annotation_position='bottom right'
-    )
+    # Zone bands span the whole x axis, with their labels on the right edge
+    zone = dict(type='rect', xref='x domain', x0=0, x1=1, yref='y', layer='below', line_width=0)
+    zone_label = dict(xref='x domain', x=1, xanchor='right', yref='y', showarrow=False)
     
-    # Add yellow zone (moderate)
-    fig.add_hrect(
-        y0=CLEAN_THRESHOLD,
-        y1=DIRTY_THRESHOLD,
-        fillcolor='rgba(255, 193, 7, 0.05)',
-        layer='below',
-        line_width=0,
-        annotation_text='🟡 MODERATE',
-        annotation_position='right'
-    )
+    # Color the line based on zones: green below CLEAN, red above DIRTY.
+    # The upper edge is nudged so a reading of exactly DIRTY stays yellow.
+    zones = np.digitize(intensities, [CLEAN_THRESHOLD, np.nextafter(DIRTY_THRESHOLD, np.inf)])
+    colors = _ZONE_COLORS[zones]
     
-    # Color the line based on zones
-    colors = []
-    for intensity in intensities:
-        if intensity < CLEAN_THRESHOLD:
-            colors.append('#4CAF50')  # Green
-        elif intensity > DIRTY_THRESHOLD:
-            colors.append('#f44336')  # Red
-        else:
-            colors.append('#FFC107')  # Yellow
-    
-    # Add forecast line with gradient effect
-    fig.add_trace(go.Scatter(
+    # Forecast line with gradient effect
+    line = go.Scatter(
         x=times,
         y=intensities,
         mode='lines+markers',
@@ -213,33 +233,102 @@ def create_forecast_chart_with_zones(duration_minutes, optimal_time):
         line=dict(color='#2196F3', width=4),
         marker=dict(
             size=6,
-            color=colors,
+            color=colors.tolist(),
             line=dict(width=1, color='white')
         ),
         hovertemplate='<b>%{x|%H:%M}</b><br>' +
                       'CI: %{y:.1f} gCO2/kWh<br>' +
                       '<extra></extra>'
-    ))
+    )
     
-    # Highlight optimal window with a more prominent style
+    shapes = [
+        # Red zone background (high carbon intensity)
+        dict(zone, y0=DIRTY_THRESHOLD, y1=y_max, fillcolor='rgba(244, 67, 54, 0.1)'),
+        # Green zone background (low carbon intensity)
+        dict(zone, y0=0, y1=CLEAN_THRESHOLD, fillcolor='rgba(76, 175, 80, 0.1)'),
+        # Yellow zone (moderate)
+        dict(zone, y0=CLEAN_THRESHOLD, y1=DIRTY_THRESHOLD, fillcolor='rgba(255, 193, 7, 0.05)')
+    ]
+    
+    annotations = [
+        dict(zone_label, y=y_max, yanchor='top', text='🔴 RED ZONE (Dirty Grid)'),
+        dict(zone_label, y=0, yanchor='bottom', text='🟢 GREEN ZONE (Clean Grid)'),
+        dict(
+            zone_label,
+            y=(CLEAN_THRESHOLD + DIRTY_THRESHOLD) / 2,
+            yanchor='middle',
+            text='🟡 MODERATE'
+        )
+    ]
+    
+    # Build the figure in one go, so Plotly validates it once
+    grid = dict(showgrid=True, gridwidth=1, gridcolor='rgba(128,128,128,0.3)')
+    layout = go.Layout(
+        title={
+            'text': '🌍 Grid Carbon Forecast - Next 24 Hours',
+            'x': 0.5,
+            'xanchor': 'center',
+            'font': {'size': 22, 'color': '#2E7D32', 'family': 'Arial Black'}
+        },
+        xaxis={
+            'title': 'Time',
+            'titlefont': {'size': 14},
+            **grid
+        },
+        yaxis={
+            'title': 'Carbon Intensity (gCO2eq/kWh)',
+            'titlefont': {'size': 14},
+            **grid
+        },
+        shapes=shapes,
+        annotations=annotations,
+        height=500,
+        showlegend=False,
+        plot_bgcolor='rgba(255,255,255,0.9)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        hovermode='x unified'
+    )
+    
+    return go.Figure(data=[line], layout=layout)
+
+
+def _overlay_optimal_window(fig, optimal_time, duration_minutes, now_utc):
+    """
+    Copy of fig with the job's optimal window and the current time marked
+    """
+    fig = go.Figure(fig)
     optimal_end = optimal_time + timedelta(minutes=duration_minutes)
-    fig.add_vrect(
+    
+    # Highlight optimal window with a more prominent style
+    fig.add_shape(
+        type='rect',
+        xref='x',
         x0=optimal_time,
         x1=optimal_end,
+        yref='y domain',
+        y0=0,
+        y1=1,
         fillcolor='rgba(76, 175, 80, 0.25)',
         layer='above',
-        line=dict(width=2, color='#2E7D32', dash='dash'),
-        annotation_text='✨ OPTIMAL WINDOW ✨',
-        annotation_position='top left',
-        annotation=dict(font=dict(size=12, color='#1B5E20', family='Arial Black'))
+        line=dict(width=2, color='#2E7D32', dash='dash')
+    )
+    fig.add_annotation(
+        xref='x',
+        x=optimal_time,
+        xanchor='left',
+        yref='y domain',
+        y=1,
+        yanchor='top',
+        text='✨ OPTIMAL WINDOW ✨',
+        showarrow=False,
+        font=dict(size=12, color='#1B5E20', family='Arial Black')
     )
     
     # Add marker for current time
-    now = datetime.now(timezone.utc)
     fig.add_shape(
         type='line',
-        x0=now,
-        x1=now,
+        x0=now_utc,
+        x1=now_utc,
         y0=0,
         y1=1,
         yref='paper',
@@ -250,7 +339,7 @@ def create_forecast_chart_with_zones(duration_minutes, optimal_time):
         )
     )
     fig.add_annotation(
-        x=now,
+        x=now_utc,
         y=1,
         yref='paper',
         text='⏰ NOW',
@@ -259,102 +348,318 @@ def create_forecast_chart_with_zones(duration_minutes, optimal_time):
         font=dict(size=12, color='red', family='Arial Black')
     )
     
-    # Update layout
-    fig.update_layout(
-        title={
-            'text': '🌍 Grid Carbon Forecast - Next 24 Hours',
-            'x': 0.5,
-            'xanchor': 'center',
-            'font': {'size': 22, 'color': '#2E7D32', 'family': 'Arial Black'}
-        },
-        xaxis={
-            'title': 'Time',
-            'titlefont': {'size': 14}
-        },
-        yaxis={
-            'title': 'Carbon Intensity (gCO2eq/kWh)',
-            'titlefont': {'size': 14}
-        },
-        height=500,
-        showlegend=False,
-        plot_bgcolor='rgba(255,255,255,0.9)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        hovermode='x unified'
-    )
-    
-    fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128,128,128,0.3)')
-    fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128,128,128,0.3)')
-    
     return fig
 
 
-def generate_simulation_logs(optimal_time, ci_now, ci_optimal, duration_minutes):
+def create_forecast_chart_with_zones(duration_minutes, optimal_time, slot, now_utc=None):
+    """
+    Create a line chart showing the 24-hour carbon intensity forecast
+    with RED ZONE (dirty) and GREEN ZONE (clean) highlighting
+    
+    slot is the start of the half-hour forecast slot the job was scheduled in;
+    now_utc is where the NOW marker goes and defaults to the time of the call.
+    """
+    if now_utc is None:
+        now_utc = datetime.now(timezone.utc)
+    return _overlay_optimal_window(
+        _build_forecast_skeleton(slot), optimal_time, duration_minutes, now_utc
+    )
+
+
+def generate_simulation_logs(optimal_time, ci_now, ci_optimal, duration_minutes, now_utc=None):
     """
     Generate fake console logs showing the scheduler in action
+    
+    now_utc is the current time the logs are written against; it defaults to
+    the time of the call.
     """
-    now = datetime.now(timezone.utc).astimezone()
+    if now_utc is None:
+        now_utc = datetime.now(timezone.utc)
+    now = now_utc.astimezone()
     optimal_local = optimal_time.astimezone()
+    end_time = optimal_local + timedelta(minutes=duration_minutes)
+    
+    # Format each timestamp once; every log line reuses them
+    now_s = now.strftime('%I:%M %p')
+    opt_s = optimal_local.strftime('%I:%M %p')
+    end_s = end_time.strftime('%I:%M %p')
     
     logs = []
     
     # Initial logs
-    logs.append(f"[{now.strftime('%I:%M %p')}] 🚀 GreenGL Scheduler initialized")
-    logs.append(f"[{now.strftime('%I:%M %p')}] 📊 Analyzing grid carbon intensity...")
-    logs.append(f"[{now.strftime('%I:%M %p')}] ⚡ Current grid status: {ci_now:.0f} gCO2/kWh")
+    logs.append(f"[{now_s}] 🚀 GreenGL Scheduler initialized")
+    logs.append(f"[{now_s}] 📊 Analyzing grid carbon intensity...")
+    logs.append(f"[{now_s}] ⚡ Current grid status: {ci_now:.0f} gCO2/kWh")
     
     # Decision logic
     if ci_now > 180:
-        logs.append(f"[{now.strftime('%I:%M %p')}] 🔴 WARNING: Grid is DIRTY ({ci_now:.0f}g/kWh)")
-        logs.append(f"[{now.strftime('%I:%M %p')}] ⏸️  Job execution PAUSED (fossil fuel heavy)")
-        logs.append(f"[{now.strftime('%I:%M %p')}] 💤 Putting GPU to sleep...")
+        logs.append(f"[{now_s}] 🔴 WARNING: Grid is DIRTY ({ci_now:.0f}g/kWh)")
+        logs.append(f"[{now_s}] ⏸️  Job execution PAUSED (fossil fuel heavy)")
+        logs.append(f"[{now_s}] 💤 Putting GPU to sleep...")
     else:
-        logs.append(f"[{now.strftime('%I:%M %p')}] 🟡 Grid is MODERATE ({ci_now:.0f}g/kWh)")
-        logs.append(f"[{now.strftime('%I:%M %p')}] ⚠️  Can run now, but not optimal")
+        logs.append(f"[{now_s}] 🟡 Grid is MODERATE ({ci_now:.0f}g/kWh)")
+        logs.append(f"[{now_s}] ⚠️  Can run now, but not optimal")
     
-    logs.append(f"[{now.strftime('%I:%M %p')}] 🔍 Scanning next 24 hours for clean energy...")
-    logs.append(f"[{now.strftime('%I:%M %p')}] ✨ Found optimal window: {optimal_local.strftime('%I:%M %p')}")
-    logs.append(f"[{now.strftime('%I:%M %p')}] 🟢 Expected CI: {ci_optimal:.0f}g/kWh (CLEAN ENERGY!)")
+    logs.append(f"[{now_s}] 🔍 Scanning next 24 hours for clean energy...")
+    logs.append(f"[{now_s}] ✨ Found optimal window: {opt_s}")
+    logs.append(f"[{now_s}] 🟢 Expected CI: {ci_optimal:.0f}g/kWh (CLEAN ENERGY!)")
     
     # Calculate delay
-    delay = optimal_time - datetime.now(timezone.utc)
+    delay = optimal_time - now_utc
     delay_hours = delay.total_seconds() / 3600
     
     if delay_hours > 1:
-        logs.append(f"[{now.strftime('%I:%M %p')}] ⏰ Scheduling job for {optimal_local.strftime('%I:%M %p')} ({delay_hours:.1f}h delay)")
-        logs.append(f"[{now.strftime('%I:%M %p')}] 💾 Job state saved to disk")
-        logs.append(f"[{now.strftime('%I:%M %p')}] 📅 Wake-up alarm set")
+        logs.append(f"[{now_s}] ⏰ Scheduling job for {opt_s} ({delay_hours:.1f}h delay)")
+        logs.append(f"[{now_s}] 💾 Job state saved to disk")
+        logs.append(f"[{now_s}] 📅 Wake-up alarm set")
         
         # Simulated future log
         logs.append("")
-        logs.append(f"[{optimal_local.strftime('%I:%M %p')}] ⏰ WAKE UP! Optimal window reached")
-        logs.append(f"[{optimal_local.strftime('%I:%M %p')}] 🌞 Grid powered by RENEWABLES")
-        logs.append(f"[{optimal_local.strftime('%I:%M %p')}] 🚀 Waking up GPU...")
-        logs.append(f"[{optimal_local.strftime('%I:%M %p')}] ⚡ Resuming job execution")
-        logs.append(f"[{optimal_local.strftime('%I:%M %p')}] 🎯 Running at {ci_optimal:.0f}g/kWh (optimal!)")
+        logs.append(f"[{opt_s}] ⏰ WAKE UP! Optimal window reached")
+        logs.append(f"[{opt_s}] 🌞 Grid powered by RENEWABLES")
+        logs.append(f"[{opt_s}] 🚀 Waking up GPU...")
+        logs.append(f"[{opt_s}] ⚡ Resuming job execution")
+        logs.append(f"[{opt_s}] 🎯 Running at {ci_optimal:.0f}g/kWh (optimal!)")
     else:
-        logs.append(f"[{now.strftime('%I:%M %p')}] 🚀 Optimal window is NOW! Starting job...")
-        logs.append(f"[{now.strftime('%I:%M %p')}] ⚡ GPU at full power")
+        logs.append(f"[{now_s}] 🚀 Optimal window is NOW! Starting job...")
+        logs.append(f"[{now_s}] ⚡ GPU at full power")
     
     # Completion estimate
-    end_time = optimal_local + timedelta(minutes=duration_minutes)
-    logs.append(f"[{optimal_local.strftime('%I:%M %p')}] 📊 Job progress: 0% → 100%")
-    logs.append(f"[{end_time.strftime('%I:%M %p')}] ✅ Job completed successfully!")
+    logs.append(f"[{opt_s}] 📊 Job progress: 0% → 100%")
+    logs.append(f"[{end_s}] ✅ Job completed successfully!")
     
     # Savings
-    power_kw = 0.3
-    duration_hours = duration_minutes / 60
-    co2_now = ci_now * power_kw * duration_hours
-    co2_optimal = ci_optimal * power_kw * duration_hours
-    savings = co2_now - co2_optimal
-    
-    logs.append(f"[{end_time.strftime('%I:%M %p')}] 🌱 Carbon saved: {savings:.1f}g CO2")
-    logs.append(f"[{end_time.strftime('%I:%M %p')}] 🎉 Efficiency: {((savings/co2_now)*100):.0f}% reduction")
-    logs.append(f"[{end_time.strftime('%I:%M %p')}] 💚 Thank you for being carbon-aware!")
+    co2 = _compute_co2(ci_now, ci_optimal, duration_minutes)
+    logs.append(f"[{end_s}] 🌱 Carbon saved: {co2.savings:.1f}g CO2")
+    logs.append(f"[{end_s}] 🎉 Efficiency: {co2.savings_percent:.0f}% reduction")
+    logs.append(f"[{end_s}] 💚 Thank you for being carbon-aware!")
     
     return logs
 
 
+@st.fragment
+def _render_results(results):
+    """
+    Render the scheduling results, charts, console and action buttons.
+    Runs as a fragment so the buttons in here only rerun this section.
+    """
+    st.markdown("---")
+    st.markdown("## 📊 Scheduling Results")
+    
+    # Key metrics
+    col_m1, col_m2, col_m3, col_m4 = st.columns(4)
+    
+    # One reading of the clock for the metrics, the chart and the console below
+    now_utc = datetime.now(timezone.utc)
+    optimal_local = results['optimal_time'].astimezone()
+    delay = results['optimal_time'] - now_utc
+    delay_hours = delay.total_seconds() / 3600
+    co2_now, co2_optimal, savings, savings_percent = _compute_co2(
+        results['ci_now'], results['ci_optimal'], results['duration_minutes']
+    )
+    
+    with col_m1:
+        st.metric(
+            label="🕐 Optimal Start Time",
+            value=optimal_local.strftime("%I:%M %p"),
+            delta=f"{optimal_local.strftime('%b %d')}"
+        )
+    
+    with col_m2:
+        st.metric(
+            label="⏳ Recommended Delay",
+            value=f"{int(delay_hours)}h {int((delay_hours % 1) * 60)}m",
+            delta="Wait time" if delay_hours > 0 else "Start now"
+        )
+    
+    with col_m3:
+        st.metric(
+            label="💰 Carbon Savings",
+            value=f"{savings_percent:.1f}%",
+            delta=f"{results['ci_now'] - results['ci_optimal']:.1f} gCO2/kWh"
+        )
+    
+    with col_m4:
+        if results['ci_optimal'] < 100:
+            rating = "🟢 Excellent"
+        elif results['ci_optimal'] < 150:
+            rating = "🟡 Good"
+        elif results['ci_optimal'] < 200:
+            rating = "🟠 Fair"
+        else:
+            rating = "🔴 Poor"
+        
+        st.metric(
+            label="📈 Optimal CI Rating",
+            value=rating,
+            delta=f"{results['ci_optimal']:.1f} gCO2/kWh"
+        )
+    
+    # Comparison graph
+    st.markdown("### 🔄 Dirty vs Clean Comparison")
+    fig_comparison = create_comparison_graph(
+        results['duration_minutes'],
+        results['ci_now'],
+        results['ci_optimal'],
+        # The chart only shows hours and minutes, so drop the rest from the cache key
+        optimal_local.replace(second=0, microsecond=0)
+    )
+    st.plotly_chart(fig_comparison, use_container_width=True, theme=None, config=_CHART_CONFIG)
+    
+    # Detailed comparison cards
+    col_card1, col_card2 = st.columns(2)
+    
+    with col_card1:
+        st.markdown('<div class="dirty-card">', unsafe_allow_html=True)
+        st.markdown("#### 🔴 If you run NOW (Dirty)")
+        st.markdown(f"""
+        - **Carbon Intensity**: {results['ci_now']:.2f} gCO2eq/kWh
+        - **Estimated CO2**: {co2_now:.2f}g
+        - **Status**: ⚠️ Higher emissions
+        - **Grid**: Likely fossil fuel heavy
+        """)
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    with col_card2:
+        st.markdown('<div class="clean-card">', unsafe_allow_html=True)
+        st.markdown(f"#### 🟢 If you run at {optimal_local.strftime('%I:%M %p')} (Clean)")
+        st.markdown(f"""
+        - **Carbon Intensity**: {results['ci_optimal']:.2f} gCO2eq/kWh
+        - **Estimated CO2**: {co2_optimal:.2f}g
+        - **Savings**: ✅ {savings:.2f}g CO2 ({savings_percent:.1f}%)
+        - **Grid**: More renewable energy
+        """)
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Impact statement
+    st.markdown("---")
+    st.markdown("### 🌍 Environmental Impact")
+    
+    if savings_percent > 50:
+        impact_emoji = "🎉"
+        impact_text = "Excellent! Scheduling at this time will significantly reduce your carbon footprint."
+    elif savings_percent > 25:
+        impact_emoji = "👍"
+        impact_text = "Great! You'll make a meaningful reduction in carbon emissions."
+    elif savings_percent > 10:
+        impact_emoji = "✓"
+        impact_text = "Good! Every bit of carbon saved helps the environment."
+    else:
+        impact_emoji = "ℹ️"
+        impact_text = "Current time is already quite optimal. Minor savings available."
+    
+    st.success(f"{impact_emoji} {impact_text}")
+    
+    # Annual impact if run daily
+    daily_savings = savings
+    annual_savings = daily_savings * 365
+    st.info(
+        f"💡 **Annual Impact**: If you run this job daily at the optimal time, "
+        f"you could save approximately **{annual_savings:.1f}g CO2 per year** "
+        f"(~{annual_savings/1000:.2f} kg CO2)"
+    )
+    
+    # Forecast chart with zones
+    st.markdown("---")
+    st.markdown("### 📈 Grid Carbon Forecast - Red Zone vs Green Zone")
+    st.markdown("*Watch how carbon intensity changes throughout the day*")
+    fig_forecast = create_forecast_chart_with_zones(
+        results['duration_minutes'],
+        results['optimal_time'],
+        results['forecast_slot'],
+        now_utc
+    )
+    st.plotly_chart(fig_forecast, use_container_width=True, theme=None, config=_CHART_CONFIG)
+    
+    # Live Simulation Console
+    st.markdown("---")
+    st.markdown("### 🖥️ Live Scheduler Console")
+    st.markdown("*See how GreenGL orchestrates your job for maximum carbon efficiency*")
+    
+    # Create console-like container
+    console_container = st.container()
+    with console_container:
+        # Generate and display logs
+        logs = generate_simulation_logs(
+            results['optimal_time'],
+            results['ci_now'],
+            results['ci_optimal'],
+            results['duration_minutes'],
+            now_utc=now_utc
+        )
+        
+        body = "".join(
+            f'<div class="console-log">{log if log else "&nbsp;"}</div>'
+            for log in logs
+        )
+        console_html = (
+            '<div class="console-box">'
+            '<div class="console-header">🌿 GreenGL Scheduler v1.0 - Carbon-Aware GPU Orchestration</div>'
+            f'{body}</div>'
+        )
+        st.markdown(console_html, unsafe_allow_html=True)
+    
+    # Add "typing" animation effect for wow factor
+    if st.button("🎬 Replay Simulation", use_container_width=False):
+        # The "typing" effect is a staggered CSS reveal, so the browser plays
+        # it and the script doesn't block while it runs
+        body = "".join(
+            f'<div class="console-log" style="animation-delay: {i * 0.3:.1f}s">{log}</div>'
+            for i, log in enumerate(log for log in logs if log)
+        )
+        st.markdown(
+            '<div class="console-box console-replay">'
+            '<div class="console-header">🌿 GreenGL Scheduler v1.0 - Live Simulation</div>'
+            f'{body}</div>',
+            unsafe_allow_html=True
+        )
+    
+    # Action buttons
+    st.markdown("---")
+    col_action1, col_action2, col_action3 = st.columns([1, 1, 1])
+    
+    with col_action1:
+        if st.button("📅 Export Schedule", use_container_width=True):
+            schedule_text = f"""
+GreenGL Studio - Job Schedule
+================================
+File: {results['filename']}
+Duration: {results['duration_minutes']} minutes
+Optimal Start: {optimal_local.strftime('%Y-%m-%d %H:%M:%S %Z')}
+Carbon Intensity: {results['ci_optimal']:.2f} gCO2eq/kWh
+Expected CO2: {co2_optimal:.2f}g
+Savings vs Now: {savings:.2f}g ({savings_percent:.1f}%)
+================================
+Generated by GreenGL Studio
+{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+"""
+            st.download_button(
+                label="Download Schedule",
+                data=schedule_text,
+                file_name=f"schedule_{results['filename']}.txt",
+                mime="text/plain"
+            )
+    
+    with col_action2:
+        if st.button("🔄 Schedule Another Job", use_container_width=True):
+            del st.session_state.results
+            st.rerun()
+    
+    with col_action3:
+        if st.button("ℹ️ Learn More", use_container_width=True):
+            st.info(
+                "GreenGL Studio uses real-time carbon intensity forecasts to schedule "
+                "computational jobs during periods of lower emissions. By running jobs "
+                "when renewable energy is more available, you can significantly reduce "
+                "your carbon footprint without changing your code!"
+            )
+
+
 def main():
+    # Styles, injected in a single element. Streamlit drops elements that a
+    # rerun doesn't emit again, so this has to be sent on every run
+    st.markdown(_CSS, unsafe_allow_html=True)
+    
     # Header
     st.markdown('<div class="main-header">🌱 GreenGL Studio</div>', unsafe_allow_html=True)
     st.markdown('<div class="sub-header">Carbon-Aware Job Scheduler - Run your code when the grid is greenest</div>', unsafe_allow_html=True)
@@ -401,12 +706,14 @@ def main():
             }
             st.success(f"✅ Loaded: {uploaded_file.name}")
             
+            # Decode the upload once; reruns reuse it until a new file arrives
+            if st.session_state.get('_file_id') != uploaded_file.file_id:
+                st.session_state._file_content = uploaded_file.getvalue().decode('utf-8')
+                st.session_state._file_id = uploaded_file.file_id
+            
             # Show file preview
             with st.expander("📄 Preview Script"):
-                file_content = uploaded_file.read().decode('utf-8')
-                st.code(file_content, language='python')
-                # Reset file pointer
-                uploaded_file.seek(0)
+                st.code(st.session_state._file_content, language='python')
     
     with col2:
         st.markdown("### ⏱️ Step 2: Set Job Duration")
@@ -448,265 +755,49 @@ def main():
         if uploaded_file is None:
             st.error("⚠️ Please upload a Python file first!")
         else:
-            with st.spinner("🔍 Finding the greenest time to run your job..."):
-                # Get optimal schedule
-                try:
-                    optimal_time, ci_optimal = get_best_start_time(
-                        duration_minutes=duration_minutes,
-                        max_window_hours=search_window if 'search_window' in locals() else 24
-                    )
-                    
-                    # Get current CI
-                    forecast = _generate_mock_forecast()
-                    wf = WindowedForecast(forecast, duration_minutes, datetime.now(timezone.utc))
-                    ci_now = wf[0].value
-                    
-                    # Store in session state
-                    st.session_state.results = {
-                        'optimal_time': optimal_time,
-                        'ci_optimal': ci_optimal,
-                        'ci_now': ci_now,
-                        'duration_minutes': duration_minutes,
-                        'filename': uploaded_file.name
-                    }
-                    
-                except Exception as e:
-                    st.error(f"❌ Error: {str(e)}")
-                    return
+            now_utc = datetime.now(timezone.utc)
+            # The forecast changes every half hour, so the same inputs in the same
+            # slot give the same schedule; reuse it while its start is still ahead
+            slot = now_utc.replace(minute=now_utc.minute // 30 * 30, second=0, microsecond=0)
+            sched_key = (duration_minutes, search_window, slot)
+            results = st.session_state.get('results')
+            if (results is not None and st.session_state.get('_sched_key') == sched_key
+                    and results['optimal_time'] >= now_utc):
+                results['filename'] = uploaded_file.name
+            else:
+                with st.spinner("🔍 Finding the greenest time to run your job..."):
+                    # Get optimal schedule
+                    try:
+                        optimal_time, ci_optimal = get_best_start_time(
+                            duration_minutes=duration_minutes,
+                            max_window_hours=search_window if 'search_window' in locals() else 24,
+                            now=now_utc
+                        )
+                        
+                        # Get current CI, from the same forecast and time the
+                        # schedule was picked from (generated once per slot)
+                        forecast = _generate_mock_forecast(now_utc)
+                        wf = WindowedForecast(forecast, duration_minutes, now_utc)
+                        ci_now = wf[0].value
+                        
+                        # Store in session state
+                        st.session_state.results = {
+                            'optimal_time': optimal_time,
+                            'ci_optimal': ci_optimal,
+                            'ci_now': ci_now,
+                            'duration_minutes': duration_minutes,
+                            'forecast_slot': slot,
+                            'filename': uploaded_file.name
+                        }
+                        st.session_state._sched_key = sched_key
+                        
+                    except Exception as e:
+                        st.error(f"❌ Error: {str(e)}")
+                        return
     
     # Display results if available
     if 'results' in st.session_state:
-        results = st.session_state.results
-        
-        st.markdown("---")
-        st.markdown("## 📊 Scheduling Results")
-        
-        # Key metrics
-        col_m1, col_m2, col_m3, col_m4 = st.columns(4)
-        
-        optimal_local = results['optimal_time'].astimezone()
-        delay = results['optimal_time'] - datetime.now(timezone.utc)
-        delay_hours = delay.total_seconds() / 3600
-        
-        with col_m1:
-            st.metric(
-                label="🕐 Optimal Start Time",
-                value=optimal_local.strftime("%I:%M %p"),
-                delta=f"{optimal_local.strftime('%b %d')}"
-            )
-        
-        with col_m2:
-            st.metric(
-                label="⏳ Recommended Delay",
-                value=f"{int(delay_hours)}h {int((delay_hours % 1) * 60)}m",
-                delta="Wait time" if delay_hours > 0 else "Start now"
-            )
-        
-        with col_m3:
-            savings_percent = ((results['ci_now'] - results['ci_optimal']) / results['ci_now'] * 100)
-            st.metric(
-                label="💰 Carbon Savings",
-                value=f"{savings_percent:.1f}%",
-                delta=f"{results['ci_now'] - results['ci_optimal']:.1f} gCO2/kWh"
-            )
-        
-        with col_m4:
-            if results['ci_optimal'] < 100:
-                rating = "🟢 Excellent"
-            elif results['ci_optimal'] < 150:
-                rating = "🟡 Good"
-            elif results['ci_optimal'] < 200:
-                rating = "🟠 Fair"
-            else:
-                rating = "🔴 Poor"
-            
-            st.metric(
-                label="📈 Optimal CI Rating",
-                value=rating,
-                delta=f"{results['ci_optimal']:.1f} gCO2/kWh"
-            )
-        
-        # Comparison graph
-        st.markdown("### 🔄 Dirty vs Clean Comparison")
-        fig_comparison, co2_now, co2_optimal, savings, savings_percent = create_comparison_graph(
-            results['duration_minutes'],
-            results['ci_now'],
-            results['ci_optimal'],
-            optimal_local
-        )
-        st.plotly_chart(fig_comparison, use_container_width=True)
-        
-        # Detailed comparison cards
-        col_card1, col_card2 = st.columns(2)
-        
-        with col_card1:
-            st.markdown('<div class="dirty-card">', unsafe_allow_html=True)
-            st.markdown("#### 🔴 If you run NOW (Dirty)")
-            st.markdown(f"""
-            - **Carbon Intensity**: {results['ci_now']:.2f} gCO2eq/kWh
-            - **Estimated CO2**: {co2_now:.2f}g
-            - **Status**: ⚠️ Higher emissions
-            - **Grid**: Likely fossil fuel heavy
-            """)
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with col_card2:
-            st.markdown('<div class="clean-card">', unsafe_allow_html=True)
-            st.markdown(f"#### 🟢 If you run at {optimal_local.strftime('%I:%M %p')} (Clean)")
-            st.markdown(f"""
-            - **Carbon Intensity**: {results['ci_optimal']:.2f} gCO2eq/kWh
-            - **Estimated CO2**: {co2_optimal:.2f}g
-            - **Savings**: ✅ {savings:.2f}g CO2 ({savings_percent:.1f}%)
-            - **Grid**: More renewable energy
-            """)
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Impact statement
-        st.markdown("---")
-        st.markdown("### 🌍 Environmental Impact")
-        
-        if savings_percent > 50:
-            impact_emoji = "🎉"
-            impact_text = "Excellent! Scheduling at this time will significantly reduce your carbon footprint."
-        elif savings_percent > 25:
-            impact_emoji = "👍"
-            impact_text = "Great! You'll make a meaningful reduction in carbon emissions."
-        elif savings_percent > 10:
-            impact_emoji = "✓"
-            impact_text = "Good! Every bit of carbon saved helps the environment."
-        else:
-            impact_emoji = "ℹ️"
-            impact_text = "Current time is already quite optimal. Minor savings available."
-        
-        st.success(f"{impact_emoji} {impact_text}")
-        
-        # Annual impact if run daily
-        daily_savings = savings
-        annual_savings = daily_savings * 365
-        st.info(
-            f"💡 **Annual Impact**: If you run this job daily at the optimal time, "
-            f"you could save approximately **{annual_savings:.1f}g CO2 per year** "
-            f"(~{annual_savings/1000:.2f} kg CO2)"
-        )
-        
-        # Forecast chart with zones
-        st.markdown("---")
-        st.markdown("### 📈 Grid Carbon Forecast - Red Zone vs Green Zone")
-        st.markdown("*Watch how carbon intensity changes throughout the day*")
-        fig_forecast = create_forecast_chart_with_zones(results['duration_minutes'], results['optimal_time'])
-        st.plotly_chart(fig_forecast, use_container_width=True)
-        
-        # Live Simulation Console
-        st.markdown("---")
-        st.markdown("### 🖥️ Live Scheduler Console")
-        st.markdown("*See how GreenGL orchestrates your job for maximum carbon efficiency*")
-        
-        # Create console-like container
-        console_container = st.container()
-        with console_container:
-            st.markdown("""
-            <style>
-                .console-box {
-                    background-color: #0a0a0a;
-                    color: #00ff00;
-                    padding: 20px;
-                    border-radius: 10px;
-                    font-family: 'Courier New', monospace;
-                    font-size: 14px;
-                    max-height: 400px;
-                    overflow-y: auto;
-                    border: 2px solid #00ff00;
-                    box-shadow: 0 0 10px rgba(0, 255, 0, 0.3);
-                }
-                .console-log {
-                    margin: 5px 0;
-                    line-height: 1.6;
-                }
-                .console-header {
-                    color: #00ffff;
-                    font-weight: bold;
-                    border-bottom: 1px solid #00ff00;
-                    padding-bottom: 10px;
-                    margin-bottom: 10px;
-                }
-            </style>
-            """, unsafe_allow_html=True)
-            
-            # Generate and display logs
-            logs = generate_simulation_logs(
-                results['optimal_time'],
-                results['ci_now'],
-                results['ci_optimal'],
-                results['duration_minutes']
-            )
-            
-            console_html = '<div class="console-box">'
-            console_html += '<div class="console-header">🌿 GreenGL Scheduler v1.0 - Carbon-Aware GPU Orchestration</div>'
-            
-            for log in logs:
-                if log == "":
-                    console_html += '<div class="console-log">&nbsp;</div>'
-                else:
-                    console_html += f'<div class="console-log">{log}</div>'
-            
-            console_html += '</div>'
-            st.markdown(console_html, unsafe_allow_html=True)
-        
-        # Add "typing" animation effect for wow factor
-        if st.button("🎬 Replay Simulation", use_container_width=False):
-            replay_container = st.empty()
-            displayed_logs = []
-            
-            for log in logs:
-                if log != "":
-                    displayed_logs.append(log)
-                    console_html = '<div class="console-box">'
-                    console_html += '<div class="console-header">🌿 GreenGL Scheduler v1.0 - Live Simulation</div>'
-                    for displayed_log in displayed_logs:
-                        console_html += f'<div class="console-log">{displayed_log}</div>'
-                    console_html += '</div>'
-                    replay_container.markdown(console_html, unsafe_allow_html=True)
-                    time.sleep(0.3)  # Typing effect delay
-        
-        # Action buttons
-        st.markdown("---")
-        col_action1, col_action2, col_action3 = st.columns([1, 1, 1])
-        
-        with col_action1:
-            if st.button("📅 Export Schedule", use_container_width=True):
-                schedule_text = f"""
-GreenGL Studio - Job Schedule
-================================
-File: {results['filename']}
-Duration: {results['duration_minutes']} minutes
-Optimal Start: {optimal_local.strftime('%Y-%m-%d %H:%M:%S %Z')}
-Carbon Intensity: {results['ci_optimal']:.2f} gCO2eq/kWh
-Expected CO2: {co2_optimal:.2f}g
-Savings vs Now: {savings:.2f}g ({savings_percent:.1f}%)
-================================
-Generated by GreenGL Studio
-{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-"""
-                st.download_button(
-                    label="Download Schedule",
-                    data=schedule_text,
-                    file_name=f"schedule_{results['filename']}.txt",
-                    mime="text/plain"
-                )
-        
-        with col_action2:
-            if st.button("🔄 Schedule Another Job", use_container_width=True):
-                del st.session_state.results
-                st.rerun()
-        
-        with col_action3:
-            if st.button("ℹ️ Learn More", use_container_width=True):
-                st.info(
-                    "GreenGL Studio uses real-time carbon intensity forecasts to schedule "
-                    "computational jobs during periods of lower emissions. By running jobs "
-                    "when renewable energy is more available, you can significantly reduce "
-                    "your carbon footprint without changing your code!"
-                )
+        _render_results(st.session_state.results)
     
     # Footer
     st.markdown("---")